@@ -0,0 +1,63 @@
+"""
+cache.py
+
+Purpose:
+- SQLite cache of enriched video metadata, shared across runs of src/collect_video_metadata_from_ids.py
+- Resume/skip becomes one indexed query instead of a scan of the per_video folder
+- One row per video: video_id, scraped_at (ISO, UTC), payload (the per-video JSON record as bytes)
+
+Default location: <out_dir>/metadata.sqlite (point --cache-db at a shared file to skip across dated output folders)
+
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Optional, Set
+
+
+class VideoCache:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "video_id TEXT PRIMARY KEY, "
+            "scraped_at TEXT, "
+            "payload BLOB)"
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "VideoCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def video_ids(self, scraped_since: Optional[str] = None) -> Set[str]:
+        """
+        All cached video IDs, or only those scraped at/after `scraped_since`.
+        scraped_at values are UTC ISO strings, so string comparison orders them correctly.
+        """
+        if scraped_since is None:
+            rows = self.conn.execute("SELECT video_id FROM videos")
+        else:
+            rows = self.conn.execute(
+                "SELECT video_id FROM videos WHERE scraped_at >= ?", (scraped_since,)
+            )
+        return {r[0] for r in rows}
+
+    def put(self, video_id: str, scraped_at: Optional[str], payload: bytes) -> None:
+        """Insert or refresh one video; committed right away so an interrupted run can resume."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO videos (video_id, scraped_at, payload) VALUES (?, ?, ?)",
+            (video_id, scraped_at, payload),
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
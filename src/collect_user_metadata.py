@@ -31,9 +31,18 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # optional: faster JSON parsing, falls back to stdlib json
+    orjson = None
+
+
+# bound once at import: now_iso() runs for every video/user
+_UTC = timezone.utc
+
 
 def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(_UTC).isoformat()
 
 def safe_int(x: Any) -> Optional[int]:
     try:
@@ -95,11 +104,11 @@ def run_ytdlp_json(
         cmd.extend(["--user-agent", user_agent])
 
     try:
+        # stdout stays bytes: the JSON parser decodes UTF-8 itself
         p = subprocess.run(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
             timeout=timeout_sec,
         )
     except subprocess.TimeoutExpired:
@@ -109,13 +118,13 @@ def run_ytdlp_json(
     except Exception as e:
         return YtDlpResult(raw=None, error=f"exception: {e}", returncode=1)
 
-    stderr = (p.stderr or "").strip()
+    stderr = (p.stderr or b"").decode("utf-8", errors="replace").strip()
     if p.returncode != 0:
         short_err = stderr[-2000:] if len(stderr) > 2000 else stderr
         return YtDlpResult(raw=None, error=short_err or "yt-dlp failed", returncode=p.returncode, stderr=stderr)
 
     try:
-        raw = json.loads(p.stdout)
+        raw = orjson.loads(p.stdout) if orjson is not None else json.loads(p.stdout)
         return YtDlpResult(raw=raw, error=None, returncode=0, stderr=stderr)
     except json.JSONDecodeError:
         return YtDlpResult(raw=None, error="failed to parse yt-dlp JSON output", returncode=2, stderr=stderr)
@@ -296,7 +305,10 @@ def main() -> int:
         "errors": errors,
     }
 
-    out_file.write_text(json.dumps(final_payload, indent=2), encoding="utf-8")
+    if orjson is not None:
+        out_file.write_bytes(orjson.dumps(final_payload, option=orjson.OPT_INDENT_2))
+    else:
+        out_file.write_text(json.dumps(final_payload, indent=2), encoding="utf-8")
 
     print(f"\nDone. Wrote: {out_file}")
     if errors:
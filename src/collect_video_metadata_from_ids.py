@@ -4,167 +4,808 @@ collect_video_metadata_from_ids.py
 
 Purpose:
 - General: Extracts the VideoIDs from output of src/collect_user_metadata.py and fetches metadata for each video.
-- Tiktok comments: Can attempt comment extraction via --write-comments, but this often leads to ERROR (functionality can be turned on and off)
-- Reruns: If running on an input produces a partial output (i.e., if you stop early due to multiple ERRORS), the script will skip video IDs that it has already aprsed metadata for, as long as you are in the same folder.
+- Tiktok comments: Can attempt comment extraction via --comments (off by default), but this often leads to ERROR and slows every video down
+- Size: formats/thumbnails are trimmed to the fields the CSV step uses and request headers are dropped (--full-info keeps everything)
+- Reruns: If running on an input produces a partial output (i.e., if you stop early due to multiple ERRORS), the script will skip video IDs that it has already aprsed metadata for, as long as you use the same cache (default: <out_dir>/metadata.sqlite, see src/cache.py).
 - ERROR support: To handle bot dection, by default, the script stops running after 5 consecutive ERRORS. This is a parameter that can be modified, or set to 0 to be disabled (not recommended). 
+- Speed: Uses the yt-dlp Python API in-process (no subprocess per video) and fetches --concurrency videos at a time.
 s
 Outputs:
-- One combined JSON: <out_dir>/videos_enriched_<timestamp>.json
-- Optionally per-video JSON files: <out_dir>/per_video/<video_id>.json
+- One combined JSON: <out_dir>/videos_enriched_<timestamp>.json (written as results come in)
+- Optionally per-video JSON files: <out_dir>/per_video/<video_id>.json (<video_id>.json.zst with --compress)
+- SQLite cache of every fetched video: <out_dir>/metadata.sqlite (used for resume)
 
 Command line examples:
   python collect_video_metadata_from_ids.py \
     --input ../outputs/raw/2026-02-01/tiktok_seed_users_20260201_214501.json \
     --out ../outputs/enriched/2026-02-01 \
     --sleep 2.0 --jitter 1.5 \
+    --concurrency 4 \
     --write-per-video
 
-  # Resume (default behavior if per_video exists):
+  # Resume (default behavior if the cache exists):
   python collect_video_metadata_from_ids.py \
     --input ../outputs/raw/2026-02-01/tiktok_seed_users_20260201_214501.json \
     --out ../outputs/enriched/2026-02-01 \
     --write-per-video
 
-  # Disable comment extraction:
+  # Attempt comment extraction (slower, more ERRORs):
   python collect_video_metadata_from_ids.py \
     --input ../outputs/raw/...json --out outputs/enriched/... \
-    --write-per-video --no-comments
+    --write-per-video --comments
 
 """
 
 import argparse
+import asyncio
 import json
+import mmap
+import os
+import queue
 import random
-import subprocess
+import re
+import threading
 import time
-from datetime import datetime, timezone
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from yt_dlp import YoutubeDL
+from yt_dlp import dependencies as ytdlp_deps
+from yt_dlp.utils import DownloadError
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encode/decode, falls back to stdlib json
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:  # optional: only needed for --compress
+    zstd = None
+
+from cache import VideoCache
+
+
+@dataclass(slots=True)
+class VideoItem:
+    video_id: str
+    url: str
+    username: str
+
+
+# bound once at import: now_iso() runs for every video/user
+_UTC = timezone.utc
 
 
 def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(_UTC).isoformat()
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when available (falls back for values it can't encode, e.g. >64-bit ints)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json_file(path: Path) -> Any:
+    """
+    Parse a JSON file. With orjson, parse straight from a read-only memory map:
+    no private copy of the file and no separate UTF-8 decode pass.
+    """
+    if orjson is None:
+        return json.loads(path.read_bytes())
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return orjson.loads(b"")  # mmap can't map an empty file; raises JSONDecodeError
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            return orjson.loads(buf)
+
+
+class _QuietLogger:
+    """Swallow yt-dlp's own console output; errors are reported through the exception instead."""
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
 
+    def warning(self, msg: str) -> None:
+        pass
 
-def run_ytdlp_dump_json(
-    url: str,
+    def error(self, msg: str) -> None:
+        pass
+
+
+def ytdlp_params(
     timeout_sec: int = 180,
     user_agent: Optional[str] = None,
     proxy: Optional[str] = None,
-    attempt_comments: bool = True,
-) -> Tuple[Optional[Dict[str, Any]], Optional[str], int]:
-    """Returns: (json_dict or None, error_string or None, returncode)."""
-    cmd = [
-        "yt-dlp",
-        "--no-download",
-        "-J",
-        "--skip-download",
-        "--dump-single-json",
-    ]
-
-    # Try to fetch comments
-    # This may cause an increased error out rate, so it is optional
-    if attempt_comments:
-        cmd.append("--write-comments")
-
+    attempt_comments: bool = False,
+) -> Dict[str, Any]:
+    """Options for the in-process YoutubeDL (equivalent of `yt-dlp -J --skip-download`)."""
+    params: Dict[str, Any] = {
+        "skip_download": True,
+        # metadata only: one URL = one video, no side files, no post-processing
+        "noplaylist": True,
+        "extract_flat": "in_playlist",
+        "writesubtitles": False,
+        "writeinfojson": False,
+        "postprocessors": [],
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "logger": _QuietLogger(),
+        "socket_timeout": timeout_sec,
+        # Try to fetch comments
+        # This may cause an increased error out rate, so it is optional
+        "getcomments": attempt_comments,
+    }
     if user_agent:
-        cmd += ["--user-agent", user_agent]
-
+        params["http_headers"] = {"User-Agent": user_agent}
     if proxy:
-        cmd += ["--proxy", proxy]
+        params["proxy"] = proxy
+    return params
 
-    cmd.append(url)
 
-    try:
-        p = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout_sec,
-        )
-    except subprocess.TimeoutExpired:
-        return None, "timeout", 124
-    except FileNotFoundError:
-        return None, "yt-dlp not found (is your venv active? try `yt-dlp --version`)", 127
-    except Exception as e:
-        return None, f"exception: {e}", 1
+# One YoutubeDL per worker thread: extractor/cookie setup is paid once per thread
+# and reused for every video, without sharing an instance across threads.
+# Each instance also keeps its HTTP session, so connections to www.tiktok.com stay
+# alive (no new TCP/TLS handshake per video) when yt-dlp's requests or curl_cffi
+# handler is installed; the urllib fallback opens a new connection per request.
+_ydl_local = threading.local()
+# Every instance handed out, so their sessions (and cookie jars) are closed after the run
+_ydl_instances: List[YoutubeDL] = []
+_ydl_instances_lock = threading.Lock()
+
+
+def get_ytdlp(params: Dict[str, Any]) -> YoutubeDL:
+    ydl = getattr(_ydl_local, "ydl", None)
+    if ydl is None:
+        ydl = YoutubeDL(params)
+        _ydl_local.ydl = ydl
+        with _ydl_instances_lock:
+            _ydl_instances.append(ydl)
+    return ydl
+
+
+def close_ytdlp_instances() -> None:
+    """Close the YoutubeDL of every worker thread (call once the threads are done)."""
+    with _ydl_instances_lock:
+        instances = list(_ydl_instances)
+        _ydl_instances.clear()
+    for ydl in instances:
+        try:
+            ydl.close()
+        except Exception as e:
+            print(f"Warning: closing yt-dlp failed: {e}")
+
+
+# Fields kept per format / thumbnail by prune_info (what video_metadata_to_csv.py reads)
+FORMAT_KEYS = ("format_id", "ext", "vcodec", "acodec", "width", "height", "tbr", "filesize", "filesize_approx")
+THUMBNAIL_KEYS = ("id", "url")
+
+
+def prune_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shrink a yt-dlp info dict before it is stored: formats/thumbnails keep only
+    FORMAT_KEYS/THUMBNAIL_KEYS, and request headers/duplicate format lists are dropped.
+    These arrays (signed URLs, headers, cookies per format) are most of the infojson.
+    """
+    info = {k: v for k, v in info.items() if k not in ("http_headers", "requested_formats", "requested_downloads")}
+    formats = info.get("formats")
+    if isinstance(formats, list):
+        info["formats"] = [
+            {k: f[k] for k in FORMAT_KEYS if k in f} for f in formats if isinstance(f, dict)
+        ]
+    thumbnails = info.get("thumbnails")
+    if isinstance(thumbnails, list):
+        info["thumbnails"] = [
+            {k: t[k] for k in THUMBNAIL_KEYS if k in t} for t in thumbnails if isinstance(t, dict)
+        ]
+    return info
+
+
+# yt-dlp errors that mean "slow down" rather than "this video failed". The status code must stand
+# alone: a bare "429" substring also matches video IDs and URLs quoted in ordinary errors
+RATE_LIMIT_SIGNALS = re.compile(
+    r"(?<!\d)429(?!\d)|too many requests|rate[- ]?limit|blocked|captcha", re.IGNORECASE
+)
+
+
+def is_rate_limited(err: Optional[str]) -> bool:
+    return bool(err) and RATE_LIMIT_SIGNALS.search(err) is not None
+
+
+def retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    """Retry-After header of an HTTP error anywhere in yt-dlp's exception chain, if present."""
+    for _ in range(5):
+        if exc is None:
+            return None
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        value = headers.get("Retry-After") if headers else None
+        if value:
+            value = value.strip()
+            if value.isdigit():
+                return float(value)
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if when.tzinfo is None:
+                # "-0000" zone parses to a naive datetime; HTTP dates are UTC
+                when = when.replace(tzinfo=timezone.utc)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        exc_info = getattr(exc, "exc_info", None)
+        exc = getattr(exc, "cause", None) or (exc_info[1] if exc_info else None) or exc.__cause__
+    return None
+
+
+def has_pooled_http() -> bool:
+    """True if yt-dlp can use a pooled (keep-alive) HTTP handler."""
+    return bool(
+        (ytdlp_deps.requests and ytdlp_deps.urllib3)
+        or getattr(ytdlp_deps, "curl_cffi", None)
+    )
 
-    if p.returncode != 0:
-        err = (p.stderr or "").strip()
+
+def fetch_video_info(
+    url: str, params: Dict[str, Any], prune: bool = True
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], int, Optional[float]]:
+    """Returns: (json_dict or None, error_string or None, returncode, retry_after seconds or None)."""
+    ydl = get_ytdlp(params)
+    try:
+        info = ydl.extract_info(url, download=False)
+    except DownloadError as e:
+        err = str(e).strip()
         if len(err) > 2000:
             err = err[-2000:]
-        return None, err or "yt-dlp failed", p.returncode
+        return None, err or "yt-dlp failed", 1, retry_after_seconds(e)
+    except Exception as e:
+        return None, f"exception: {e}", 1, None
+
+    if not info:
+        return None, "yt-dlp returned no metadata", 1, None
+    info = ydl.sanitize_info(info)
+    return (prune_info(info) if prune else info), None, 0, None
 
-    try:
-        return json.loads(p.stdout), None, 0
-    except json.JSONDecodeError:
-        return None, "failed to parse yt-dlp JSON output", 2
 
+@dataclass
+class FetchResult:
+    record_json: Optional[bytes]
+    error: Optional[str]
+    returncode: int
+    scraped_at: str
+    retry_after: Optional[float] = None
+
+
+def fetch_record(item: VideoItem, params: Dict[str, Any], prune: bool = True) -> FetchResult:
+    """
+    Fetch one video and serialize its output record, all in the calling worker thread,
+    so the event loop never walks the info dict. The bytes are shared by every sink
+    (combined file, cache, per-video file) instead of being encoded once per sink.
+    """
+    info, err, rc, retry_after = fetch_video_info(item.url, params, prune)
+    scraped_at = now_iso()
+    if err or not info:
+        return FetchResult(None, err, rc, scraped_at, retry_after)
+
+    record = {
+        "video_id": item.video_id,
+        "url": item.url,
+        "username": item.username,
+        "scraped_at": scraped_at,
+        "yt_dlp": info,
+    }
+    return FetchResult(json_dumps(record), None, 0, scraped_at)
 
-def extract_video_urls_from_seed_run(seed_run_json: Dict[str, Any]) -> List[Dict[str, str]]:
-    """Returns list of {"video_id": "...", "url": "...", "username": "..."} items."""
-    out: List[Dict[str, str]] = []
+
+VIDEO_URL_TEMPLATE = "https://www.tiktok.com/@{}/video/{}".format
+
+
+def extract_video_urls_from_seed_run(seed_run_json: Dict[str, Any]) -> List[VideoItem]:
+    """Returns VideoItems in input order, de-duplicated by video_id in the same pass."""
+    out: List[VideoItem] = []
+    seen: Set[str] = set()
     results = seed_run_json.get("results", [])
     for r in results:
         profile = r.get("profile", {}) or {}
         username = profile.get("username") or "unknown"
+        # URL fallback only possible with a real username; decided once per user, not per video
+        make_url = VIDEO_URL_TEMPLATE if username != "unknown" else None
+        username = str(username)
         for v in (r.get("videos") or []):
             vid = v.get("video_id")
-            url = v.get("url")
-            if not url and vid and username and username != "unknown":
-                url = f"https://www.tiktok.com/@{username}/video/{vid}"
-            if vid and url:
-                out.append({"video_id": str(vid), "url": str(url), "username": str(username)})
-
-    # de-dup by video_id preserving order
-    seen: Set[str] = set()
-    deduped: List[Dict[str, str]] = []
-    for item in out:
-        if item["video_id"] not in seen:
-            seen.add(item["video_id"])
-            deduped.append(item)
-    return deduped
+            if not vid:
+                continue
+            url = v.get("url") or (make_url and make_url(username, vid))
+            if not url:
+                continue
+            vid = str(vid)
+            if vid not in seen:
+                seen.add(vid)
+                out.append(VideoItem(vid, str(url), username))
+    return out
 
 
 def existing_video_ids(per_video_dir: Path) -> Set[str]:
     """
-    Detect already-enriched videos by looking for <video_id>.json in per_video_dir.
-    We trust filenames, not file contents, so it's fast.
+    Detect already-enriched videos by looking for <video_id>.json or <video_id>.json.zst
+    in per_video_dir. We trust filenames, not file contents, so it's fast.
+    Only used to seed the cache from runs that predate it.
     """
-    if not per_video_dir.exists() or not per_video_dir.is_dir():
+    if not per_video_dir.is_dir():
         return set()
 
+    # os.scandir: one pass over the directory, plain names (no fnmatch, no Path per file)
     done: Set[str] = set()
-    for p in per_video_dir.glob("*.json"):
-        if p.stem:
-            done.add(p.stem)
+    with os.scandir(per_video_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name.endswith(".json"):
+                vid = name[:-5]
+            elif name.endswith(".json.zst"):
+                vid = name[:-9]
+            else:
+                continue
+            if vid:
+                done.add(vid)
     return done
 
 
+def read_per_video_file(per_video_dir: Path, video_id: str) -> bytes:
+    """Raw JSON bytes of a per-video file, decompressing <video_id>.json.zst if that's what exists."""
+    path = per_video_dir / f"{video_id}.json"
+    if path.exists():
+        return path.read_bytes()
+    if zstd is None:
+        raise RuntimeError("zstandard is not installed (pip install zstandard)")
+    return zstd.ZstdDecompressor().decompress((per_video_dir / f"{video_id}.json.zst").read_bytes())
+
+
+def import_per_video_files(cache: VideoCache, per_video_dir: Path) -> int:
+    """
+    One-time migration: load per-video JSON files written before the cache existed,
+    so their IDs keep being skipped. Returns the number of files imported.
+    """
+    # Unreadable files (truncated by a crash, corrupt frames, permissions) are skipped, not fatal
+    errors: Tuple[type, ...] = (RuntimeError, OSError, json.JSONDecodeError, AttributeError)
+    if zstd is not None:
+        errors += (zstd.ZstdError,)
+    imported = 0
+    for vid in sorted(existing_video_ids(per_video_dir)):
+        try:
+            payload = read_per_video_file(per_video_dir, vid)
+            scraped_at = json_loads(payload).get("scraped_at")
+        except errors as e:
+            print(f"Cache: skipped per_video/{vid}: {e}")
+            continue
+        cache.put(vid, scraped_at, payload)
+        imported += 1
+    return imported
+
+
+class DomainLimiter:
+    """
+    Per-host pacing for concurrent fetches.
+    - at least min_interval (+ 0..jitter) seconds between requests to the same host
+    - optionally at most N requests per T-second window (window=(N, T))
+    - adaptive: penalize() pauses a host and doubles its interval (up to max_interval);
+      every `recover_after` successes in a row halve it again, back down to min_interval
+    Requests to different hosts never wait on each other.
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        jitter: float = 0.0,
+        window: Optional[Tuple[int, float]] = None,
+        max_interval: float = 300.0,
+        recover_after: int = 10,
+    ) -> None:
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.window = window
+        self.max_interval = max_interval
+        self.recover_after = recover_after
+        self.last_request_ts: Dict[str, float] = {}
+        self.interval: Dict[str, float] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._success_streak: Dict[str, int] = defaultdict(int)
+        self._recent: Dict[str, Deque[float]] = defaultdict(deque)
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def penalize(self, host: str, delay: float) -> None:
+        """Rate-limit signal: no requests to `host` for `delay` seconds, then at half the rate."""
+        until = time.monotonic() + delay
+        self._blocked_until[host] = max(self._blocked_until.get(host, 0.0), until)
+        current = self.interval.get(host, self.min_interval)
+        self.interval[host] = min(self.max_interval, max(1.0, current * 2))
+        self._success_streak[host] = 0
+
+    def reward(self, host: str) -> None:
+        """Successful request: after `recover_after` in a row, step the rate back up."""
+        current = self.interval.get(host, self.min_interval)
+        if current <= self.min_interval:
+            return
+        self._success_streak[host] += 1
+        if self._success_streak[host] >= self.recover_after:
+            self.interval[host] = max(self.min_interval, current / 2)
+            self._success_streak[host] = 0
+
+    async def acquire(self, host: str) -> None:
+        """Wait until a request to `host` is allowed, then record it."""
+        async with self._locks[host]:
+            now = time.monotonic()
+            wait = 0.0
+
+            last = self.last_request_ts.get(host)
+            if last is not None:
+                interval = self.interval.get(host, self.min_interval)
+                interval = max(0.0, interval + random.random() * self.jitter)
+                wait = last + interval - now
+
+            blocked_until = self._blocked_until.get(host)
+            if blocked_until is not None:
+                wait = max(wait, blocked_until - now)
+
+            if self.window:
+                max_requests, window_sec = self.window
+                recent = self._recent[host]
+                while recent and recent[0] <= now - window_sec:
+                    recent.popleft()
+                if len(recent) >= max_requests:
+                    wait = max(wait, recent[0] + window_sec - now)
+
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            now = time.monotonic()
+            self.last_request_ts[host] = now
+            if self.window:
+                self._recent[host].append(now)
+
+
+def parse_window(s: str) -> Tuple[int, float]:
+    """Parse --requests-per-window "N/T" (N requests per T seconds)."""
+    try:
+        n, t = s.split("/", 1)
+        window = (int(n), float(t))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N/T (e.g. 30/60), got {s!r}")
+    if window[0] <= 0 or window[1] <= 0:
+        raise argparse.ArgumentTypeError(f"N and T must be positive, got {s!r}")
+    return window
+
+
+class RunOutputWriter:
+    """
+    Streams the combined run JSON to disk instead of building it in memory.
+    Results are written as they complete and only counted here. Error fields are
+    kept column-wise (one list/array per field, not one dict per error) and written
+    at close() together with the run counts, after the results list.
+    """
+
+    def __init__(self, path: Path, header: Dict[str, Any]) -> None:
+        self.path = path
+        self.succeeded = 0
+        self._err_video_ids: List[str] = []
+        self._err_urls: List[str] = []
+        self._err_usernames: List[str] = []
+        self._err_scraped_at: List[str] = []
+        self._err_returncodes = array("i")
+        self._err_messages: List[str] = []
+        self._fp = open(path, "wb", buffering=1024 * 1024)
+        # header is a non-empty dict: drop its closing brace and open the results list
+        self._fp.write(json_dumps(header)[:-1] + b',"results":[')
+
+    @property
+    def failed(self) -> int:
+        return len(self._err_video_ids)
+
+    def write_result(self, record_json: bytes) -> None:
+        self._fp.write(b",\n" if self.succeeded else b"\n")
+        self._fp.write(record_json)
+        self.succeeded += 1
+
+    def add_error(
+        self, video_id: str, url: str, username: str, scraped_at: str, returncode: int, error: str
+    ) -> None:
+        self._err_video_ids.append(video_id)
+        self._err_urls.append(url)
+        self._err_usernames.append(username)
+        self._err_scraped_at.append(scraped_at)
+        self._err_returncodes.append(returncode)
+        self._err_messages.append(error)
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        errors = [
+            {
+                "video_id": vid,
+                "url": url,
+                "username": username,
+                "scraped_at": scraped_at,
+                "returncode": rc,
+                "error": err,
+            }
+            for vid, url, username, scraped_at, rc, err in zip(
+                self._err_video_ids,
+                self._err_urls,
+                self._err_usernames,
+                self._err_scraped_at,
+                self._err_returncodes,
+                self._err_messages,
+            )
+        ]
+        footer = {
+            **summary,
+            "video_count_succeeded": self.succeeded,
+            "video_count_failed": self.failed,
+            "errors": errors,
+        }
+        # footer is a non-empty dict: drop its opening brace to continue the object
+        self._fp.write(b"\n]," + json_dumps(footer)[1:])
+        self._fp.close()
+
+
+class PerVideoWriter:
+    """
+    Writes <per_video_dir>/<video_id>.json on a background thread so disk I/O
+    stays off the fetch loop. put() only blocks if `maxsize` records are queued.
+    With compress=True, files are zstd level 3 (<video_id>.json.zst, ~5-10x smaller).
+    With batch_fsync=N, every N files are fsynced together with the folder.
+    Each file is written under a hidden .tmp name and renamed into place, so a crash
+    never leaves a truncated <video_id>.json(.zst) that a later run would trust.
+    """
+
+    def __init__(
+        self, per_video_dir: Path, batch_fsync: int = 0, compress: bool = False, maxsize: int = 256
+    ) -> None:
+        self.per_video_dir = per_video_dir
+        self.batch_fsync = batch_fsync
+        self.compress = compress
+        self._q: "queue.Queue[Optional[Tuple[str, bytes]]]" = queue.Queue(maxsize=maxsize)
+        self._unsynced: List[Path] = []
+        self._thread = threading.Thread(target=self._writer_loop, name="per-video-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, video_id: str, record_json: bytes) -> None:
+        self._q.put((video_id, record_json))
+
+    def close(self) -> None:
+        """Flush everything still queued and stop the thread."""
+        self._q.put(None)
+        self._thread.join()
+
+    def _writer_loop(self) -> None:
+        # compressor lives on this thread only (ZstdCompressor is not thread-safe)
+        cctx = zstd.ZstdCompressor(level=3) if self.compress else None
+        while True:
+            item = self._q.get()
+            if item is None:
+                break
+            video_id, record_json = item
+            if cctx is not None:
+                path = self.per_video_dir / f"{video_id}.json.zst"
+                record_json = cctx.compress(record_json)
+            else:
+                path = self.per_video_dir / f"{video_id}.json"
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            try:
+                with open(tmp_path, "wb", buffering=64 * 1024) as fp:
+                    fp.write(record_json)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"ERROR writing {path}: {e}")
+                try:
+                    tmp_path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+                continue
+            if self.batch_fsync > 0:
+                self._unsynced.append(path)
+                if len(self._unsynced) >= self.batch_fsync:
+                    self._fsync()
+        if self._unsynced:
+            self._fsync()
+
+    def _fsync(self) -> None:
+        try:
+            for path in self._unsynced:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            fd = os.open(self.per_video_dir, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"ERROR syncing {self.per_video_dir}: {e}")
+        self._unsynced.clear()
+
+
+async def enrich_videos(
+    videos: List[VideoItem],
+    args: argparse.Namespace,
+    cache: VideoCache,
+    writer: RunOutputWriter,
+    per_video_writer: Optional[PerVideoWriter],
+) -> None:
+    """
+    Fetch metadata for all videos with --concurrency worker coroutines pulling from
+    one shared iterator (so pending work costs nothing per video). Each fetch runs in
+    a worker thread so network waits overlap; results are handled on the event loop,
+    so the counters below need no locking.
+
+    The threads come from a dedicated pool of --concurrency workers: asyncio.to_thread
+    would share the loop's default executor, capped at min(32, CPUs + 4) threads.
+    """
+    params = ytdlp_params(
+        timeout_sec=args.timeout,
+        user_agent=args.user_agent,
+        proxy=args.proxy,
+        attempt_comments=args.comments,
+    )
+    limiter = DomainLimiter(
+        args.min_interval,
+        args.jitter,
+        args.requests_per_window,
+        max_interval=args.max_backoff,
+        recover_after=args.recover_after,
+    )
+    stop = asyncio.Event()
+    workers = max(1, args.concurrency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdlp")
+
+    total = len(videos)
+    finished = 0
+    consecutive_errors = 0
+
+    async def enrich_one(item: VideoItem) -> None:
+        nonlocal finished, consecutive_errors
+
+        # delay to be less suspicious (paced per host, not per worker)
+        host = urlparse(item.url).netloc
+        await limiter.acquire(host)
+        if stop.is_set():
+            return
+        res = await loop.run_in_executor(executor, fetch_record, item, params, not args.full_info)
+
+        vid = item.video_id
+        url = item.url
+        finished += 1
+
+        if res.error or not res.record_json:
+            print(f"[{finished}/{total}] {vid} … ERROR")
+            consecutive_errors += 1
+
+            # Soft block: pause this host with exponential backoff (or the server's Retry-After),
+            # never longer than --max-backoff
+            if is_rate_limited(res.error):
+                backoff = res.retry_after
+                if backoff is not None:
+                    backoff = min(args.max_backoff, backoff)
+                else:
+                    # Capped exponent: with --max-consecutive-errors 0 the streak is unbounded and
+                    # 2.0 ** n overflows a float past n = 1023
+                    exponent = min(consecutive_errors - 1, 30)
+                    backoff = min(args.max_backoff, args.backoff_base * 2 ** exponent)
+                    backoff += random.random() * args.jitter
+                limiter.penalize(host, backoff)
+                print(f"  rate-limited by {host}; backing off {backoff:.1f}s")
+
+            writer.add_error(
+                vid, url, item.username, res.scraped_at, res.returncode, res.error or "unknown error"
+            )
+
+            if stop.is_set():
+                return
+
+            # Optional: Stop after N consecutive errors 
+            # Default is 5; setting to 0 turns off the feature
+            if args.max_consecutive_errors > 0 and consecutive_errors >= args.max_consecutive_errors:
+                print(
+                    f"\nStopping early after {consecutive_errors} consecutive errors "
+                    f"(likely rate-limited or blocked)."
+                )
+                stop.set()
+
+            # Optional: stop after N total errors
+            # Default is 0; setting to 0 turns off the feature
+            elif args.max_total_errors > 0 and writer.failed >= args.max_total_errors:
+                print(f"\nStopping early after {writer.failed} total errors.")
+                stop.set()
+
+        else:
+            print(f"[{finished}/{total}] {vid} … OK")
+            consecutive_errors = 0
+            limiter.reward(host)
+
+            writer.write_result(res.record_json)
+            cache.put(vid, res.scraped_at, res.record_json)
+
+            if per_video_writer:
+                per_video_writer.put(vid, res.record_json)
+
+    pending = iter(videos)
+
+    async def worker() -> None:
+        # next() on the shared iterator never awaits, so each video goes to exactly one worker
+        for item in pending:
+            if stop.is_set():
+                return
+            await enrich_one(item)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(workers):
+                tg.create_task(worker())
+    finally:
+        # Waits for fetches still running (e.g. after Ctrl-C) before closing their YoutubeDLs
+        executor.shutdown(wait=True, cancel_futures=True)
+        close_ytdlp_instances()
+
+
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(
         description="Enrich TikTok video IDs/URLs into per-video metadata JSON using yt-dlp"
     )
     ap.add_argument("--input", required=True, help="Path to seed-user run JSON (the file with results[].videos[]).",)
     ap.add_argument("--out", default="outputs/enriched", help="Output directory.")
-    ap.add_argument("--sleep", type=float, default=2.0, help="Base sleep seconds between videos.")
-    ap.add_argument("--jitter", type=float, default=1.5, help="Random extra sleep (0..jitter) seconds.")
-    ap.add_argument("--timeout", type=int, default=180, help="yt-dlp timeout per video (seconds).")
+    ap.add_argument("--min-interval-per-host", "--sleep", dest="min_interval", type=float, default=2.0, help="Minimum seconds between requests to the same host (--sleep is an alias).")
+    ap.add_argument("--jitter", type=float, default=1.5, help="Random extra interval (0..jitter) seconds per request.")
+    ap.add_argument("--requests-per-window", type=parse_window, default=None, metavar="N/T", help="Optional cap of N requests per T seconds per host (e.g. 30/60).")
+    ap.add_argument("--backoff-base", type=float, default=5.0, help="First backoff (seconds) when rate-limited; doubles per consecutive error.")
+    ap.add_argument("--max-backoff", type=float, default=300.0, help="Cap for the backoff and for the slowed-down per-host interval (seconds).")
+    ap.add_argument("--recover-after", type=int, default=10, help="Successes in a row before a slowed-down host's rate is stepped back up.")
+    ap.add_argument("--timeout", type=int, default=180, help="yt-dlp socket timeout per request (seconds).")
+    ap.add_argument("--concurrency", type=int, default=4, help="Number of videos fetched at the same time (default: 4).")
     ap.add_argument("--user-agent", default=None, help="Optional custom User-Agent.")
     ap.add_argument("--proxy", default=None, help="Optional proxy URL (e.g. http://host:port).")
-    ap.add_argument("--no-comments", action="store_true", help="Do not attempt comment extraction.")
+    ap.add_argument("--comments", dest="comments", action="store_true", default=False, help="Attempt comment extraction (slower, often leads to ERROR).")
+    ap.add_argument("--no-comments", dest="comments", action="store_false", help="Do not attempt comment extraction (default).")
+    ap.add_argument("--full-info", action="store_true", help="Keep the full yt-dlp info (all format/thumbnail fields and request headers).")
     ap.add_argument("--write-per-video", action="store_true", help="Write one JSON per video in out/per_video/.")
+    ap.add_argument("--compress", action="store_true", help="With --write-per-video, write zstd-compressed <video_id>.json.zst files (needs zstandard).")
+    ap.add_argument("--batch-fsync", type=int, default=0, metavar="N", help="With --write-per-video, fsync per-video files in groups of N (0 = leave it to the OS).")
     ap.add_argument("--max-videos", type=int, default=0, help="Optional cap for testing (0 = no cap).")
     ap.add_argument("--max-consecutive-errors", type=int, default=5, help="Stop early after this many consecutive errors (default: 5; 0 = disabled).",)
     ap.add_argument("--max-total-errors", type=int, default=0, help="Stop early after this many total errors (0 = disabled).",)
-    ap.add_argument("--no-skip-existing", action="store_true", help="Do NOT skip video IDs that already have per-video JSON files in out/per_video/.",)
+    ap.add_argument("--no-skip-existing", action="store_true", help="Do NOT skip video IDs that are already in the metadata cache.",)
+    ap.add_argument("--cache-db", default=None, help="SQLite metadata cache (default: <out>/metadata.sqlite).")
+    ap.add_argument("--refresh-older-than", type=float, default=0, metavar="DAYS", help="Re-fetch cached videos scraped more than DAYS ago (0 = never).",)
     return ap.parse_args()
 
 
 def main() -> int:
     args = parse_args()
 
+    if args.compress and zstd is None:
+        print("ERROR: --compress needs the zstandard package (pip install zstandard)")
+        return 2
+
     in_path = Path(args.input)
     if not in_path.exists():
         print(f"ERROR: input file not found: {in_path}")
@@ -175,7 +816,7 @@ def main() -> int:
 
     # Load seed JSON and extract videos
     try:
-        seed_run = json.loads(in_path.read_text(encoding="utf-8"))
+        seed_run = read_json_file(in_path)
     except json.JSONDecodeError as e:
         print(f"ERROR: input is not valid JSON: {in_path}")
         print(f"       {e}")
@@ -190,108 +831,65 @@ def main() -> int:
     if args.write_per_video:
         per_video_dir.mkdir(parents=True, exist_ok=True)
 
+    cache_path = Path(args.cache_db) if args.cache_db else out_dir / "metadata.sqlite"
+    cache = VideoCache(cache_path)
+    if cache.count() == 0:
+        imported = import_per_video_files(cache, per_video_dir)
+        if imported:
+            print(f"Cache: imported {imported} existing per-video JSON files into {cache_path}")
+
     done_ids: Set[str] = set()
     skip_existing = not args.no_skip_existing
     if skip_existing:
-        done_ids = existing_video_ids(per_video_dir)
+        scraped_since = None
+        if args.refresh_older_than > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=args.refresh_older_than)
+            scraped_since = cutoff.isoformat()
+        done_ids = cache.video_ids(scraped_since)
         if done_ids:
             before = len(videos)
-            videos = [v for v in videos if v["video_id"] not in done_ids]
+            videos = [v for v in videos if v.video_id not in done_ids]
             skipped = before - len(videos)
-            print(f"Resume: found {len(done_ids)} existing per-video JSON files. Skipping {skipped} IDs.")
+            print(f"Resume: found {len(done_ids)} cached videos in {cache_path}. Skipping {skipped} IDs.")
         else:
-            print("Resume: no existing per-video JSON files found to skip.")
-
-    enriched: List[Dict[str, Any]] = []
-    errors: List[Dict[str, Any]] = []
+            print("Resume: no cached videos found to skip.")
 
     print(f"Found {len(videos)} videos to enrich (after de-dup/optional skip)")
+    if not has_pooled_http():
+        print('Note: yt-dlp has no keep-alive HTTP handler; run `pip install "yt-dlp[default,curl-cffi]"` for connection reuse.')
 
-    consecutive_errors = 0
-
-    for i, item in enumerate(videos, 1):
-        vid = item["video_id"]
-        url = item["url"]
-        print(f"[{i}/{len(videos)}] {vid} … ", end="", flush=True)
-
-        info, err, rc = run_ytdlp_dump_json(
-            url=url,
-            timeout_sec=args.timeout,
-            user_agent=args.user_agent,
-            proxy=args.proxy,
-            attempt_comments=not args.no_comments,
-        )
-
-        if err or not info:
-            print("ERROR")
-            consecutive_errors += 1
-
-            errors.append(
-                {
-                    "video_id": vid,
-                    "url": url,
-                    "username": item.get("username"),
-                    "scraped_at": now_iso(),
-                    "returncode": rc,
-                    "error": err or "unknown error",
-                }
-            )
-
-            # Optional: Stop after N consecutive errors 
-            # Default is 5; setting to 0 turns off the feature
-            if args.max_consecutive_errors > 0 and consecutive_errors >= args.max_consecutive_errors:
-                print(
-                    f"\nStopping early after {consecutive_errors} consecutive errors "
-                    f"(likely rate-limited or blocked)."
-                )
-                break
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_file = out_dir / f"videos_enriched_{ts}.json"
+    writer = RunOutputWriter(
+        out_file,
+        {
+            "run_started_at": now_iso(),
+            "source_input": str(in_path),
+            "attempted_comments": args.comments,
+        },
+    )
 
-            # Optional: stop after N total errors
-            # Default is 0; setting to 0 turns off the feature
-            if args.max_total_errors > 0 and len(errors) >= args.max_total_errors:
-                print(f"\nStopping early after {len(errors)} total errors.")
-                break
+    per_video_writer = None
+    if args.write_per_video:
+        per_video_writer = PerVideoWriter(per_video_dir, args.batch_fsync, compress=args.compress)
 
-        else:
-            print("OK")
-            record = {
-                "video_id": vid,
-                "url": url,
-                "username": item.get("username"),
-                "scraped_at": now_iso(),
-                "yt_dlp": info,
+    # The file is closed (and valid JSON) even if the run is interrupted.
+    try:
+        asyncio.run(enrich_videos(videos, args, cache, writer, per_video_writer))
+    finally:
+        if per_video_writer:
+            per_video_writer.close()
+        cache.close()
+        writer.close(
+            {
+                "video_count_requested": len(videos),
+                "skipped_existing": len(done_ids) if skip_existing else 0,
             }
-            consecutive_errors = 0
-
-            enriched.append(record)
-
-            if args.write_per_video:
-                (per_video_dir / f"{vid}.json").write_text(
-                    json.dumps(record, indent=2),
-                    encoding="utf-8",
-                )
-
-        # delay to be less suspicious
-        time.sleep(max(0.0, args.sleep + random.random() * args.jitter))
-
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_file = out_dir / f"videos_enriched_{ts}.json"
-    payload = {
-        "run_started_at": now_iso(),
-        "source_input": str(in_path),
-        "video_count_requested": len(videos),
-        "video_count_succeeded": len(enriched),
-        "video_count_failed": len(errors),
-        "attempted_comments": not args.no_comments,
-        "skipped_existing": len(done_ids) if skip_existing else 0,
-        "results": enriched,
-        "errors": errors,
-    }
-    out_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        )
 
     print(f"\nDone. Wrote: {out_file}")
-    if errors:
-        print(f"Failures: {len(errors)} (TikTok often blocks comment/extra metadata access.)")
+    if writer.failed:
+        print(f"Failures: {writer.failed} (TikTok often blocks comment/extra metadata access.)")
     return 0
 
 
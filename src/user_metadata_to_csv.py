@@ -22,15 +22,36 @@ from __future__ import annotations
 
 import argparse
 import json
+import mmap
+import os
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # optional: faster JSON parsing
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # optional: faster CSV writer, needed for --format parquet
+    pa = None
+
 
 def read_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    """With orjson, parse straight from a read-only memory map (no copy, no separate decode)."""
+    if orjson is None:
+        return json.loads(path.read_text(encoding="utf-8"))
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return orjson.loads(b"")  # mmap can't map an empty file; raises JSONDecodeError
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            return orjson.loads(buf)
 
 
 def safe_get(d: Optional[Dict[str, Any]], key: str, default=None):
@@ -61,6 +82,59 @@ def filename_timestamp(run_started_at: Optional[str]) -> str:
     return dt.strftime("%Y%m%d_%H%M%S")
 
 
+# User-level fields attached to each video row, and their output column names
+USER_META_COLUMNS = {
+    "scraped_at": "user_scraped_at",
+    "source": "user_source",
+    "username": "username",
+    "profile_url": "profile_url",
+}
+
+# Fields taken from each video entry
+VIDEO_FIELDS = [
+    "video_id",
+    "url",
+    "title",
+    "caption",
+    "timestamp",
+    "upload_date",
+    "duration_sec",
+    "uploader",
+    "uploader_id",
+    "view_count",
+    "like_count",
+    "comment_count",
+    "repost_count",
+    "hashtags",
+]
+
+# Output columns after the run_meta columns, in order
+VIDEO_COLUMNS = [*USER_META_COLUMNS.values(), *VIDEO_FIELDS]
+
+
+def write_output(df: pd.DataFrame, out_base: Path, fmt: str) -> Path:
+    """
+    Write df to <out_base>.csv or <out_base>.parquet.
+    Uses pyarrow's C++ writers when installed; CSV falls back to pandas otherwise.
+    """
+    out_path = out_base.with_suffix(f".{fmt}")
+    if fmt == "parquet":
+        if pa is None:
+            raise SystemExit("ERROR: --format parquet requires pyarrow (pip install pyarrow)")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, out_path, compression="zstd")
+    elif pa is not None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pacsv.write_csv(
+            table,
+            out_path,
+            write_options=pacsv.WriteOptions(batch_size=8192, quoting_style="needed"),
+        )
+    else:
+        df.to_csv(out_path, index=False)
+    return out_path
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", required=True, help="Input seed users JSON file")
@@ -70,6 +144,12 @@ def main():
         default="user_videos",
         help="Output filename prefix (default: user_videos)",
     )
+    ap.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Output format (default: csv; parquet needs pyarrow and is much smaller)",
+    )
     args = ap.parse_args()
 
     in_path = Path(args.in_path).expanduser().resolve()
@@ -88,55 +168,43 @@ def main():
         "user_count_failed": data.get("user_count_failed"),
     }
 
-    videos_rows: List[Dict[str, Any]] = []
-
+    # Per user: the dict videos plus the user-level fields attached to each of their rows
+    users = []
     for r in data.get("results", []):
-        if not isinstance(r, dict):
+        if not isinstance(r, dict) or not isinstance(r.get("videos"), list):
             continue
-
         profile = r.get("profile") if isinstance(r.get("profile"), dict) else None
-        scraped_at = r.get("scraped_at")
-        source = r.get("source")
-
-        username = safe_get(profile, "username", None) or r.get("username")
-        profile_url = safe_get(profile, "profile_url")
-
-        # Videos nested under each successful user result
-        for v in r.get("videos", []):
-            if not isinstance(v, dict):
-                continue
-
-            hashtags = v.get("hashtags")
-            videos_rows.append({
-                **run_meta,
-                "user_scraped_at": scraped_at,
-                "user_source": source,
-                "username": username,
-                "profile_url": profile_url,
-
-                "video_id": v.get("video_id"),
-                "url": v.get("url"),
-                "title": v.get("title"),
-                "caption": v.get("caption"),
-                "timestamp": v.get("timestamp"),
-                "upload_date": v.get("upload_date"),
-                "duration_sec": v.get("duration_sec"),
-                "uploader": v.get("uploader"),
-                "uploader_id": v.get("uploader_id"),
-                "view_count": v.get("view_count"),
-                "like_count": v.get("like_count"),
-                "comment_count": v.get("comment_count"),
-                "repost_count": v.get("repost_count"),
-                "hashtags": ",".join(hashtags) if isinstance(hashtags, list) else None,
-            })
-
-    videos_df = pd.DataFrame(videos_rows)
+        users.append({
+            "videos": [v for v in r["videos"] if isinstance(v, dict)],
+            "scraped_at": r.get("scraped_at"),
+            "source": r.get("source"),
+            "username": safe_get(profile, "username", None) or r.get("username"),
+            "profile_url": safe_get(profile, "profile_url"),
+        })
+
+    # One row per video, with the parent user's fields attached (walked by pandas, not a Python loop).
+    # meta_prefix keeps a video's own scraped_at/username/... keys from clashing with the user's;
+    # max_level=0 leaves nested video values as they are.
+    videos_df = pd.json_normalize(
+        users,
+        record_path="videos",
+        meta=list(USER_META_COLUMNS),
+        meta_prefix="user.",
+        max_level=0,
+    )
+    videos_df = videos_df.reindex(
+        columns=[*(f"user.{k}" for k in USER_META_COLUMNS), *VIDEO_FIELDS]
+    ).rename(columns={f"user.{k}": col for k, col in USER_META_COLUMNS.items()})
+    videos_df = videos_df.assign(**run_meta)
+    if "hashtags" in videos_df:
+        videos_df["hashtags"] = videos_df["hashtags"].map(
+            lambda h: ",".join(h) if isinstance(h, list) else None
+        )
+    videos_df = videos_df.reindex(columns=[*run_meta, *VIDEO_COLUMNS])
 
     ts = filename_timestamp(data.get("run_started_at"))
-    out_csv = out_dir / f"{args.prefix}_{ts}.csv"
-
-    videos_df.to_csv(out_csv, index=False)
-    print(f"Wrote {out_csv} (rows={len(videos_df):,}, cols={videos_df.shape[1]:,})")
+    out_path = write_output(videos_df, out_dir / f"{args.prefix}_{ts}", args.format)
+    print(f"Wrote {out_path} (rows={len(videos_df):,}, cols={videos_df.shape[1]:,})")
 
 
 if __name__ == "__main__":
@@ -10,7 +10,7 @@ Supports:
 1) Batch enriched JSON:
    { run_started_at, ..., results: [ {...}, ... ] }
 
-2) Single-video JSON files:
+2) Single-video JSON files (plain .json or zstd-compressed .json.zst):
    { video_id, url, username, scraped_at, yt_dlp:{...} }
 
 Input:
@@ -19,6 +19,7 @@ a folder of per-video JSONs - ../outputs/enriched/2026-02-01/per_video
 
 Output:
   - ../outputs/csv_out/video_data/videos_enriched_<timestamp>.csv
+  - or .parquet / .feather with --format (needs pyarrow)
 
 Timestamp priority:
 1) run_started_at (batch)
@@ -30,21 +31,165 @@ Timestamp priority:
 from __future__ import annotations
 
 import argparse
+import csv
 import json
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-import pandas as pd
-
-def read_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
-
-
-def iter_inputs(path: Path) -> List[Path]:
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON parsing, falls back to stdlib json
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:  # optional: only needed for per-video .json.zst files
+    zstd = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: needed for --format parquet/feather
+    pa = None
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:  # optional: streams very large batch files instead of loading them whole
+    ijson = None
+
+# Batch files at least this big are parsed incrementally (with ijson) to bound memory;
+# smaller ones are loaded whole, which is several times faster
+STREAM_MIN_BYTES = 128 * 1024 * 1024
+
+# Parquet/Feather rows are buffered and written out every FLUSH_ROWS rows
+FLUSH_ROWS = 50_000
+
+RUN_META_COLUMNS = (
+    "run_started_at",
+    "source_input",
+    "video_count_requested",
+    "video_count_succeeded",
+    "video_count_failed",
+    "attempted_comments",
+    "skipped_existing",
+    "source_file",
+)
+
+FORMAT_COLUMNS = (
+    "best_format_id",
+    "best_ext",
+    "best_vcodec",
+    "best_acodec",
+    "best_width",
+    "best_height",
+    "best_tbr",
+    "best_filesize",
+)
+
+# Output columns in order, with their Arrow types (nullable, and no wider than the data needs).
+# "category" columns repeat a few values (per creator, per codec) and are dictionary-encoded
+# in Parquet. Batch rows leave source_file empty, single-video rows leave the run_* /
+# video_count_* columns empty.
+SCHEMA_FIELDS = (
+    ("run_started_at", "string"),
+    ("source_input", "string"),
+    ("video_count_requested", "int64"),
+    ("video_count_succeeded", "int64"),
+    ("video_count_failed", "int64"),
+    ("attempted_comments", "bool"),
+    ("skipped_existing", "int64"),
+    ("source_file", "string"),
+    ("video_id", "string"),
+    ("url", "string"),
+    ("username", "category"),
+    ("scraped_at", "string"),
+    ("yt_id", "string"),
+    ("title", "string"),
+    ("description", "string"),
+    ("timestamp", "int64"),
+    ("duration", "float32"),
+    ("view_count", "int64"),
+    ("like_count", "int64"),
+    ("comment_count", "int64"),
+    ("repost_count", "int64"),
+    ("save_count", "int64"),
+    ("channel", "category"),
+    ("channel_id", "category"),
+    ("uploader", "category"),
+    ("uploader_id", "category"),
+    ("track", "string"),
+    ("album", "string"),
+    ("artists", "string"),
+    ("best_format_id", "string"),
+    ("best_ext", "category"),
+    ("best_vcodec", "category"),
+    ("best_acodec", "category"),
+    ("best_width", "int32"),
+    ("best_height", "int32"),
+    ("best_tbr", "float64"),
+    ("best_filesize", "int64"),
+    ("thumb_id", "string"),
+    ("thumb_url", "string"),
+    ("webpage_url", "string"),
+    ("original_url", "string"),
+    ("extractor", "category"),
+    ("extractor_key", "category"),
+)
+COLUMNS = tuple(name for name, _ in SCHEMA_FIELDS)
+# normalize_record rows are COLUMNS minus the RUN_META_COLUMNS prefix, which is constant per
+# input file and added by OutputWriter. They carry the raw artists list, joined at write time.
+ROW_COLUMNS = COLUMNS[len(RUN_META_COLUMNS):]
+ARTISTS_IDX = ROW_COLUMNS.index("artists")
+SCHEMA = pa.schema([
+    (name, pa.dictionary(pa.int32(), pa.string()) if typ == "category" else pa.type_for_alias(typ))
+    for name, typ in SCHEMA_FIELDS
+]) if pa is not None else None
+# The Arrow IPC (Feather) file format allows one dictionary per field for the whole file, but
+# every flush builds new ones: Feather stores the "category" columns as plain strings instead
+FEATHER_SCHEMA = pa.schema([
+    f.with_type(pa.string()) if pa.types.is_dictionary(f.type) else f for f in SCHEMA
+]) if pa is not None else None
+
+
+def read_raw(path: Path) -> bytes:
+    """File contents as bytes (orjson and json both take UTF-8 bytes: no decode into a str first)."""
+    data = path.read_bytes()
+    if path.name.endswith(".zst"):
+        if zstd is None:
+            raise SystemExit(f"ERROR: {path} is zstd-compressed; pip install zstandard")
+        data = zstd.ZstdDecompressor().decompress(data)
+    return data
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def walk_json(dirpath: str) -> Iterator[Path]:
+    # DirEntry.is_dir/is_file use the d_type from readdir: no stat() per entry
+    with os.scandir(dirpath) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_json(entry.path)
+            elif entry.is_file(follow_symlinks=False) and entry.name.endswith((".json", ".json.zst")):
+                yield Path(entry.path)
+
+
+def iter_inputs(path: Path) -> Iterator[Path]:
+    """Input files as they are found (unsorted: row order doesn't matter, the timestamp is a min)."""
     if path.is_dir():
-        return sorted([p for p in path.rglob("*.json") if p.is_file()])
-    return [path]
+        yield from walk_json(str(path))
+    else:
+        yield path
 
 
 def parse_iso_dt(s: Optional[str]) -> Optional[datetime]:
@@ -55,159 +200,408 @@ def parse_iso_dt(s: Optional[str]) -> Optional[datetime]:
     except Exception:
         return None
 
-def pick_best_format(formats: Any) -> Dict[str, Any]:
-    if not isinstance(formats, list) or not formats:
-        return {}
 
-    def score(fmt: Dict[str, Any]) -> Tuple[int, float, int]:
-        return (
-            int(fmt.get("height") or 0),
-            float(fmt.get("tbr") or 0.0),
-            int(fmt.get("filesize") or fmt.get("filesize_approx") or 0),
-        )
+# Start of a batch file: the collector always writes run_started_at as the first key
+BATCH_HEAD = re.compile(rb'\s*\{\s*"run_started_at"')
+
+# "YYYY-MM-DDTHH:MM:SS" - the part of an ISO timestamp that orders it (to the second)
+ISO_PREFIX = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+
+
+def intern_str(v: Any) -> Any:
+    """
+    Interned copy of a string value (one shared object per distinct creator/codec/extractor),
+    so buffered rows and the pickles sent back from worker processes hold each value once.
+    """
+    return sys.intern(v) if type(v) is str else v
+
 
-    best, best_s = None, (-1, -1.0, -1)
+def iso_candidate(v: Any) -> Optional[str]:
+    """v if it looks like an ISO timestamp, else None. A cheap check; parse_iso_dt runs only on the winner."""
+    return v if isinstance(v, str) and ISO_PREFIX.match(v) else None
+
+
+NO_FORMAT = (None,) * len(FORMAT_COLUMNS)
+NO_THUMB = (None, None)
+
+
+def pick_best_format(formats: Any) -> Tuple[Any, ...]:
+    """Values for FORMAT_COLUMNS from the highest (height, tbr, filesize) format."""
+    if not isinstance(formats, list) or not formats:
+        return NO_FORMAT
+
+    # Single pass; height alone settles most comparisons, so tbr/filesize are only read
+    # for formats at least as tall as the best so far. Kept in plain Python on purpose:
+    # copying the fields into flat arrays for a compiled (e.g. Numba) argmax costs more
+    # than this whole scan, since every value has to come out of a dict either way.
+    best, best_h, best_rest = None, -1, None
     for f in formats:
         if not isinstance(f, dict):
             continue
-        s = score(f)
-        if s > best_s:
-            best_s, best = s, f
-
-    if not isinstance(best, dict):
-        return {}
-
-    return {
-        "best_format_id": best.get("format_id"),
-        "best_ext": best.get("ext"),
-        "best_vcodec": best.get("vcodec"),
-        "best_acodec": best.get("acodec"),
-        "best_width": best.get("width"),
-        "best_height": best.get("height"),
-        "best_tbr": best.get("tbr"),
-        "best_filesize": best.get("filesize") or best.get("filesize_approx"),
-    }
-
-
-def first_thumbnail(thumbnails: Any) -> Dict[str, Any]:
+        g = f.get
+        h = g("height") or 0
+        if h < best_h:
+            continue
+        rest = (g("tbr") or 0, g("filesize") or g("filesize_approx") or 0)
+        if h > best_h or rest > best_rest:
+            best, best_h, best_rest = f, h, rest
+
+    if best is None:
+        return NO_FORMAT
+
+    return (
+        best.get("format_id"),
+        intern_str(best.get("ext")),
+        intern_str(best.get("vcodec")),
+        intern_str(best.get("acodec")),
+        best.get("width"),
+        best.get("height"),
+        best.get("tbr"),
+        best.get("filesize") or best.get("filesize_approx"),
+    )
+
+
+def first_thumbnail(thumbnails: Any) -> Tuple[Any, Any]:
+    """(thumb_id, thumb_url), preferring the cover images."""
     if not isinstance(thumbnails, list) or not thumbnails:
-        return {}
-    preferred = {t.get("id"): t for t in thumbnails if isinstance(t, dict)}
-    cover = preferred.get("cover") or preferred.get("originCover") or preferred.get("dynamicCover")
-    if isinstance(cover, dict):
-        return {"thumb_id": cover.get("id"), "thumb_url": cover.get("url")}
+        return NO_THUMB
+    # One scan, no lookup dict. Backwards, so a repeated ID resolves to its last entry
+    # (as the dict did) and the scan can stop at the first "cover" it meets
+    cover = origin = dynamic = None
+    for t in reversed(thumbnails):
+        if not isinstance(t, dict):
+            continue
+        tid = t.get("id")
+        if tid == "cover":
+            cover = t
+            break
+        if tid == "originCover" and origin is None:
+            origin = t
+        elif tid == "dynamicCover" and dynamic is None:
+            dynamic = t
+    best = cover or origin or dynamic
+    if isinstance(best, dict):
+        return (best.get("id"), best.get("url"))
     t0 = thumbnails[0] if isinstance(thumbnails[0], dict) else None
-    return {"thumb_id": t0.get("id"), "thumb_url": t0.get("url")} if isinstance(t0, dict) else {}
+    return (t0.get("id"), t0.get("url")) if isinstance(t0, dict) else NO_THUMB
 
 
-def normalize_record(item: Dict[str, Any], run_meta: Dict[str, Any]) -> Dict[str, Any]:
-    yt = item.get("yt_dlp") if isinstance(item.get("yt_dlp"), dict) else {}
+def normalize_record(item: Dict[str, Any]) -> Tuple[Any, ...]:
+    """One output row in ROW_COLUMNS order (the per-file run metadata is added on write)."""
+    ig = item.get
+    yt = ig("yt_dlp")
+    if not isinstance(yt, dict):
+        yt = {}
+    yg = yt.get
 
-    artists = yt.get("artists")
-    artists_str = ",".join(artists) if isinstance(artists, list) else None
+    artists = yg("artists")
 
-    return {
-        **run_meta,
-        "video_id": item.get("video_id") or yt.get("id"),
-        "url": item.get("url") or yt.get("webpage_url") or yt.get("original_url"),
-        "username": item.get("username") or yt.get("uploader"),
-        "scraped_at": item.get("scraped_at"),
+    return (
+        ig("video_id") or yg("id"),
+        ig("url") or yg("webpage_url") or yg("original_url"),
+        intern_str(ig("username") or yg("uploader")),
+        ig("scraped_at"),
 
         # Core yt-dlp fields
-        "yt_id": yt.get("id"),
-        "title": yt.get("title"),
-        "description": yt.get("description"),
-        "timestamp": yt.get("timestamp"),
-        "duration": yt.get("duration"),
-        "view_count": yt.get("view_count"),
-        "like_count": yt.get("like_count"),
-        "comment_count": yt.get("comment_count"),
-        "repost_count": yt.get("repost_count"),
-        "save_count": yt.get("save_count"),
+        yg("id"),
+        yg("title"),
+        yg("description"),
+        yg("timestamp"),
+        yg("duration"),
+        yg("view_count"),
+        yg("like_count"),
+        yg("comment_count"),
+        yg("repost_count"),
+        yg("save_count"),
 
         # Channel/uploader identifiers
-        "channel": yt.get("channel"),
-        "channel_id": yt.get("channel_id"),
-        "uploader": yt.get("uploader"),
-        "uploader_id": yt.get("uploader_id"),
+        intern_str(yg("channel")),
+        intern_str(yg("channel_id")),
+        intern_str(yg("uploader")),
+        intern_str(yg("uploader_id")),
 
         # Audio/music
-        "track": yt.get("track"),
-        "album": yt.get("album"),
-        "artists": artists_str,
+        yg("track"),
+        yg("album"),
+        artists if isinstance(artists, list) else None,
 
         # Summaries from large lists
-        **pick_best_format(yt.get("formats")),
-        **first_thumbnail(yt.get("thumbnails")),
+        *pick_best_format(yg("formats")),
+        *first_thumbnail(yg("thumbnails")),
 
         # URLs
-        "webpage_url": yt.get("webpage_url"),
-        "original_url": yt.get("original_url"),
-        "extractor": yt.get("extractor"),
-        "extractor_key": yt.get("extractor_key"),
-    }
+        yg("webpage_url"),
+        yg("original_url"),
+        intern_str(yg("extractor")),
+        intern_str(yg("extractor_key")),
+    )
+
+
+def join_artists(values: List[Any]) -> Any:
+    """Join a column of artist lists into "a,b,c" strings with one Arrow kernel call."""
+    try:
+        lists = pa.array(values, type=pa.list_(pa.string()))
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # non-string entries: join value by value
+        return pa.array([None if a is None else ",".join(map(str, a)) for a in values], type=pa.string())
+    return pc.binary_join(lists, ",")
+
+
+def to_arrow(values: List[Any], typ: Any) -> Any:
+    try:
+        return pa.array(values, type=typ)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Odd upstream types (numeric IDs, counts as strings, ...): coerce value by value
+        if pa.types.is_string(typ) or pa.types.is_dictionary(typ):
+            return pa.array([None if v is None else str(v) for v in values], type=typ)
+
+        def num(v: Any) -> Optional[float]:
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                return None
+
+        return pa.array([num(v) for v in values], type=pa.float64()).cast(typ, safe=False)
+
+
+class OutputWriter:
+    """
+    Streams row tuples to <path> as CSV, Parquet (snappy) or Feather (lz4).
+    CSV rows go straight to csv.writer (no pandas, no pyarrow needed); Parquet/Feather rows
+    are buffered and written as one Arrow batch per FLUSH_ROWS, so memory stays bounded.
+    Rows arrive per input file together with that file's RUN_META_COLUMNS values.
+    """
+
+    def __init__(self, path: Path, fmt: str) -> None:
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._pending: List[Tuple[Tuple[Any, ...], List[Tuple[Any, ...]]]] = []
+        self._pending_rows = 0
+        self._writer = None
+        self._fp = None
+        if fmt == "csv":
+            self._fp = open(path, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._fp, lineterminator="\n")
+            self._csv.writerow(COLUMNS)
+            return
+        if pa is None:
+            raise SystemExit(f"ERROR: --format {fmt} requires pyarrow (pip install pyarrow)")
+        if fmt == "parquet":
+            self.schema = SCHEMA
+            self._writer = pq.ParquetWriter(str(path), self.schema, compression="snappy")
+        else:
+            # Feather v2 is the Arrow IPC file format
+            self.schema = FEATHER_SCHEMA
+            self._writer = pa.ipc.new_file(
+                str(path), self.schema, options=pa.ipc.IpcWriteOptions(compression="lz4")
+            )
+
+    def write(self, run_meta: Tuple[Any, ...], rows: List[Tuple[Any, ...]]) -> None:
+        if not rows:
+            return
+        self.rows += len(rows)
+        if self._fp is not None:
+            writerow = self._csv.writerow
+            for r in rows:
+                artists = r[ARTISTS_IDX]
+                if artists is not None:
+                    r = (*r[:ARTISTS_IDX], ",".join(artists), *r[ARTISTS_IDX + 1:])
+                writerow(run_meta + r)
+            return
+        self._pending.append((run_meta, rows))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending_rows:
+            return
+        # Run metadata is one value per input file: broadcast it with a C-level list repeat
+        meta_columns: List[List[Any]] = [[] for _ in RUN_META_COLUMNS]
+        for run_meta, rows in self._pending:
+            n = len(rows)
+            for col, v in zip(meta_columns, run_meta):
+                col.extend([v] * n)
+        # rows -> columns in one C-level transpose
+        row_columns = [list(col) for col in zip(*chain.from_iterable(rows for _, rows in self._pending))]
+        self._pending, self._pending_rows = [], 0
+        columns = meta_columns + row_columns
+        arrays = [to_arrow(col, f.type) for col, f in zip(columns, self.schema)]
+        artists_idx = len(RUN_META_COLUMNS) + ARTISTS_IDX
+        arrays[artists_idx] = join_artists(columns[artists_idx])
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+        else:
+            self._flush()
+            self._writer.close()
+
+    def abort(self) -> None:
+        """Close the output after a failure, dropping any rows still buffered."""
+        self._pending = []
+        self._pending_rows = 0
+        try:
+            if self._fp is not None:
+                self._fp.close()
+            else:
+                self._writer.close()
+        except Exception:
+            pass
+
+
+def batch_run_meta(data: Dict[str, Any]) -> Tuple[Any, ...]:
+    """RUN_META_COLUMNS values for the rows of a batch file."""
+    return (
+        data.get("run_started_at"),
+        data.get("source_input"),
+        data.get("video_count_requested"),
+        data.get("video_count_succeeded"),
+        data.get("video_count_failed"),
+        data.get("attempted_comments"),
+        data.get("skipped_existing"),
+        None,  # source_file
+    )
+
+
+def stream_batch(fp: Path) -> Optional[Tuple[Dict[str, Any], List[Tuple[Any, ...]]]]:
+    """
+    Parse a batch file incrementally from a memory map: each results item is built, normalized
+    and dropped before the next, so the full JSON tree never exists in memory.
+    Top-level scalars are collected wherever they appear (the collector writes the run counts
+    after the results list). Returns (top-level scalars, rows), or None if the file has no
+    top-level results list.
+    """
+    top: Dict[str, Any] = {}
+    body: List[Tuple[Any, ...]] = []
+    saw_results = False
+    with open(fp, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        events = ijson.parse(mm, use_float=True)
+        for prefix, event, value in events:
+            if prefix == "results.item" and event == "start_map":
+                builder = ObjectBuilder()
+                builder.event(event, value)
+                for prefix, event, value in events:
+                    if prefix == "results.item" and event == "end_map":
+                        break
+                    builder.event(event, value)
+                body.append(normalize_record(builder.value))
+            elif prefix == "results" and event == "start_array":
+                saw_results = True
+            elif event in ("string", "number", "boolean", "null") and prefix and "." not in prefix:
+                top[prefix] = value
+    return (top, body) if saw_results else None
+
+
+def process_batch_file(fp: Path, data: Any) -> Tuple[Tuple[Any, ...], List[Tuple[Any, ...]], Optional[str]]:
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        return process_single_file(fp, data)
+    rows = [normalize_record(item) for item in results if isinstance(item, dict)]
+    return batch_run_meta(data), rows, iso_candidate(data.get("run_started_at"))
+
+
+def process_single_file(fp: Path, data: Any) -> Tuple[Tuple[Any, ...], List[Tuple[Any, ...]], Optional[str]]:
+    run_meta = (None,) * (len(RUN_META_COLUMNS) - 1) + (fp.name,)
+    if not isinstance(data, dict):
+        return run_meta, [], None
+    if isinstance(data.get("results"), list):
+        # batch file whose first key isn't run_started_at (e.g. re-saved with sorted keys)
+        return process_batch_file(fp, data)
+    return run_meta, [normalize_record(data)], iso_candidate(data.get("scraped_at"))
+
+
+def parse_one_file(fp: Path) -> Tuple[Tuple[Any, ...], List[Tuple[Any, ...]], Optional[str]]:
+    """
+    Read and normalize one input file (batch or single-video).
+    Returns (run_meta, rows, ISO timestamp candidate); runs in worker processes in folder mode.
+    Collector batch files start with a run_started_at key, so the first bytes route them straight
+    to the batch path; anything else is checked for a results list after parsing.
+    """
+    if ijson is not None and not fp.name.endswith(".zst") and fp.stat().st_size >= STREAM_MIN_BYTES:
+        with open(fp, "rb") as f:
+            head = f.read(64)
+        if BATCH_HEAD.match(head):
+            streamed = stream_batch(fp)
+            if streamed is not None:
+                top, body = streamed
+                return batch_run_meta(top), body, iso_candidate(top.get("run_started_at"))
+
+    raw = read_raw(fp)
+    if BATCH_HEAD.match(raw):
+        return process_batch_file(fp, loads(raw))
+    return process_single_file(fp, loads(raw))
+
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", required=True, help="Input JSON file OR folder")
     ap.add_argument("--out", dest="out_dir", required=True, help="Output directory")
     ap.add_argument("--prefix", default="videos_enriched", help="Filename prefix")
+    ap.add_argument(
+        "--format",
+        choices=["csv", "parquet", "feather"],
+        default="csv",
+        help="Output format (default: csv; parquet/feather need pyarrow)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) - 1),
+        help="Processes parsing input files in folder mode (default: CPU count - 1; use 2-4 on spinning disks)",
+    )
     args = ap.parse_args()
 
     in_path = Path(args.in_path).expanduser().resolve()
     out_dir = Path(args.out_dir).expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rows: List[Dict[str, Any]] = []
-    candidate_times: List[datetime] = []
-
-    for fp in iter_inputs(in_path):
-        data = read_json(fp)
+    # Final name depends on the earliest timestamp, known only once every input is read
+    tmp_path = out_dir / f".{args.prefix}.partial.{args.format}"
+    writer = OutputWriter(tmp_path, args.format)
+    candidate_times: List[str] = []
 
-        # Batch file
-        if isinstance(data, dict) and isinstance(data.get("results"), list):
-            dt = parse_iso_dt(data.get("run_started_at"))
-            if dt:
-                candidate_times.append(dt)
-
-            run_meta = {
-                "run_started_at": data.get("run_started_at"),
-                "source_input": data.get("source_input"),
-                "video_count_requested": data.get("video_count_requested"),
-                "video_count_succeeded": data.get("video_count_succeeded"),
-                "video_count_failed": data.get("video_count_failed"),
-                "attempted_comments": data.get("attempted_comments"),
-                "skipped_existing": data.get("skipped_existing"),
-            }
-
-            for item in data["results"]:
-                if isinstance(item, dict):
-                    rows.append(normalize_record(item, run_meta))
-
-        # Single-video file
-        elif isinstance(data, dict):
-            dt = parse_iso_dt(data.get("scraped_at"))
+    files = iter_inputs(in_path)
+    workers = max(1, args.workers) if in_path.is_dir() else 1
+    pool = None
+    try:
+        if workers > 1:
+            # Parsing + normalizing is CPU-bound and independent per file; chunksize amortizes the IPC
+            pool = ProcessPoolExecutor(max_workers=workers)
+            parsed = pool.map(parse_one_file, files, chunksize=32)
+        else:
+            parsed = map(parse_one_file, files)
+
+        for run_meta, file_rows, dt in parsed:
             if dt:
                 candidate_times.append(dt)
-
-            rows.append(
-                normalize_record(
-                    data,
-                    {"source_file": fp.name},
-                )
-            )
-
-    df = pd.DataFrame(rows)
-
-    if not candidate_times:
+            writer.write(run_meta, file_rows)
+        writer.close()
+    except BaseException:
+        # Don't leave a half-written hidden .partial file behind (Ctrl-C included)
+        writer.abort()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # The collector writes UTC ISO strings, so the date-time prefix orders them whatever the
+    # suffix ("Z", "+00:00", fractions): only the earliest needs a full parse
+    ts = None
+    for s in sorted(candidate_times, key=lambda c: c[:19]):
+        ts = parse_iso_dt(s)
+        if ts:
+            break
+    if ts is None:
         ts = datetime.now()
-    else:
-        ts = min(candidate_times)
 
-    out_csv = out_dir / f"{args.prefix}_{ts.strftime('%Y%m%d_%H%M%S')}.csv"
-    df.to_csv(out_csv, index=False)
+    out_path = out_dir / f"{args.prefix}_{ts.strftime('%Y%m%d_%H%M%S')}.{args.format}"
+    os.replace(tmp_path, out_path)
 
-    print(f"Wrote {out_csv} (rows={len(df):,}, cols={df.shape[1]:,})")
+    print(f"Wrote {out_path} (rows={writer.rows:,}, cols={len(COLUMNS):,})")
 
 
 if __name__ == "__main__":